@@ -5,6 +5,8 @@ Create and merge json schemas, with occurence counting
 """
 import copy
 from abc import ABC, abstractmethod
+from collections import Counter
+from itertools import groupby
 
 import tabulate
 
@@ -15,9 +17,15 @@ class Schema(ABC):
 
     """Base class for mergable schemas"""
 
+    __slots__ = ()
+
     @abstractmethod
-    def _iter_strings(self, indent=1, show_counts=True):
-        """Iterate over the lines of the long string representation"""
+    def _iter_strings(self, indent, count_str):
+        """
+        Iterate over the lines of the long string representation
+
+        count_str gives the occurence count prefix of a schema, chosen once for the whole dump
+        """
         ...
 
     @property
@@ -34,6 +42,30 @@ class Schema(ABC):
     def _merge_same_type(self, other: "Schema"):
         ...
 
+    def _clone(self, weight=1) -> "Schema":
+        """
+        Independent copy of the schema, sharing no mutable state with it,
+        with every count multiplied by weight
+        """
+        # substructures are copied level by level with an explicit stack,
+        # so that deeply nested schemas do not hit the recursion limit
+        res = self._copy()
+        stack = [res]
+        while stack:
+            schema = stack.pop()
+            if weight != 1 and isinstance(schema, CountableSchema):
+                schema._count *= weight
+            stack.extend(schema._copy_children())
+        return res
+
+    def _copy(self) -> "Schema":
+        """Copy of the schema itself, still sharing its substructures with self"""
+        return copy.deepcopy(self)
+
+    def _copy_children(self):
+        """Replace the substructures of a fresh copy by copies of their own, and return them"""
+        return ()
+
     def _merge(self, other: "Schema") -> "Schema":
         if isinstance(other, Empty):
             return self
@@ -42,18 +74,20 @@ class Schema(ABC):
         else:
             return self._merge_same_type(other)
 
-    def _iter_statistics(self, depth: int = 1):
+    def _collect_statistics(self, rows: list, prefix: str = "", depth: int = 1) -> None:
+        """
+        Append the statistics rows of the substructures to rows,
+        paths being prefixed with prefix
+        """
         return
 
-    def _iter_sub_statistics(self, depth: int = 1):
-        for key, *info in self._iter_statistics(depth=depth - 1):
-            yield (f"    {key}", *info)
-
     def statistics(self, **kwargs) -> None:
         """Get detailed statistics regarding type and frequencies"""
+        rows = []
+        self._collect_statistics(rows, **kwargs)
         print(
             tabulate.tabulate(
-                list(self._iter_statistics(**kwargs)),
+                rows,
                 headers=["path", "type", "occurences", "%"],
                 floatfmt=".3f",
             )
@@ -61,7 +95,8 @@ class Schema(ABC):
 
     def dumps(self, indent=1, show_counts=True) -> str:
         """Dump structure as a string"""
-        return "\n".join(self._iter_strings(indent=indent, show_counts=show_counts))
+        count_str = _count if show_counts else _no_count
+        return "\n".join(self._iter_strings(indent=indent, count_str=count_str))
 
     def __iadd__(self, other) -> "Schema":
         if not isinstance(other, Schema):
@@ -69,10 +104,16 @@ class Schema(ABC):
                 other = make_schema(other)
             except ValueError:
                 return NotImplemented
+            if isinstance(self, Empty):
+                # built right here, so it does not need to be copied like in Empty._merge
+                return other
+        # same-type countable schemas are merged in place directly
+        if type(other) is type(self) and isinstance(self, CountableSchema):
+            return self._merge_same_type(other)
         return self._merge(other)
 
     def __str__(self):
-        return "\n".join(self._iter_strings(indent=1, show_counts=True))
+        return "\n".join(self._iter_strings(indent=1, count_str=_count))
 
     def __repr__(self):
         return self.short_type_str
@@ -86,6 +127,8 @@ class CountableSchema(Schema):
     For instance Empty and Variant are not countable since they do not reflect actual json structures
     """
 
+    __slots__ = ("_count",)
+
     def __init__(self):
         self._count: int = 1
 
@@ -107,6 +150,8 @@ class Empty(Schema):
     Does NOT represent a null, that would be a Value object where value.type == NoneType instead
     """
 
+    __slots__ = ()
+
     def __hash__(self):
         return hash(None)
 
@@ -120,13 +165,16 @@ class Empty(Schema):
     def count(self) -> int:
         return 0
 
+    def _copy(self):
+        return type(self)()
+
     def _merge(self, other) -> Schema:
-        return copy.deepcopy(other)
+        return other._clone()
     
     def _merge_same_type(self, other):
         ...
 
-    def _iter_strings(self, indent=1, show_counts=True):
+    def _iter_strings(self, indent, count_str):
         yield "<empty>"
 
     @property
@@ -140,11 +188,20 @@ class Value(CountableSchema):
     Scalar Json value, either a number (int or float), a string, a boolean or null (None)
     """
 
+    __slots__ = ("type",)
+
     def __init__(self, value):
         super().__init__()
-        self.value = value
+        # only the type of the value matters to the schema, the value itself is not kept
         self.type = type(value)
 
+    @classmethod
+    def _from_type(cls, _type, count=1):
+        value = cls.__new__(cls)
+        value.type = _type
+        value._count = count
+        return value
+
     def __hash__(self):
         return hash(self.type)
 
@@ -157,6 +214,9 @@ class Value(CountableSchema):
     def __bool__(self):
         return True
 
+    def _copy(self):
+        return type(self)._from_type(self.type, self._count)
+
     def _merge_same_type(self, other):
         if self != other:
             return Variant((self, other))
@@ -164,8 +224,8 @@ class Value(CountableSchema):
             self.add_counts(other)
             return self
 
-    def _iter_strings(self, indent=1, show_counts=True):
-        yield _count(self, show_counts) + self.type.__name__
+    def _iter_strings(self, indent, count_str):
+        yield count_str(self) + self.type.__name__
 
     @property
     def short_type_str(self):
@@ -181,13 +241,32 @@ class DictStructure(CountableSchema):
     The internal structure dictionnary is proxied to enable direct acces to substructures by indexing
     """
 
-    def __init__(self, _dict):
-        for key in _dict.keys():
-            if not isinstance(key, str):
-                raise TypeError(f"Invalid type for key {key} : {type(key).__name__}")
+    __slots__ = ("keys", "_statistics_order")
 
+    def __init__(self, _dict):
         super().__init__()
-        self.keys = {key: make_schema(value) for key, value in _dict.items()}
+        self.keys = {}
+        self._statistics_order = None
+        if _dict:
+            _fill(self, _dict)
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Create the merged structure of several objects given in columnar form
+
+        columns maps each key to the sequence of its values, one per object holding that key
+        The structure counts as many objects as the longest column
+        """
+
+        res = cls({})
+        res._count = max(map(len, columns.values()), default=0)
+        for key, column in columns.items():
+            if type(key) is not str and not isinstance(key, str):
+                raise TypeError(f"Invalid type for key {key} : {type(key).__name__}")
+            if column:
+                res.keys[key] = ListStructure(column).element_schema
+        return res
 
     def __hash__(self):
         sub_dict = {key: hash(value) for key, value in self.keys.items()}
@@ -204,44 +283,91 @@ class DictStructure(CountableSchema):
 
     def __setitem__(self, key, value):
         self.keys[key] = make_schema(value)
+        self._statistics_order = None
 
     def __bool__(self):
         return bool(self.keys)
 
+    def _copy(self):
+        cls = type(self)
+        res = cls.__new__(cls)
+        res._count = self._count
+        res.keys = dict(self.keys)
+        # refers to the substructures of self
+        res._statistics_order = None
+        return res
+
+    def _copy_children(self):
+        keys = self.keys
+        for key, value in keys.items():
+            keys[key] = value._copy()
+        return keys.values()
+
     def _merge_same_type(self, other):
-        self.add_counts(other)
-        # merge each common key
-        for key in self.keys.keys() & other.keys.keys():
-            self[key] += other[key]
-        # add each new key
-        for key in other.keys.keys() - self.keys.keys():
-            self[key] = copy.copy(other[key])
+        self._count += other._count
+        self._statistics_order = None
+        keys = self.keys
+        get = keys.get
+        for key, value in other.keys.items():
+            existing = get(key)
+            if existing is None:
+                # new key, copied so that later merges do not alter the other structure
+                keys[key] = value._clone()
+            else:
+                # common key
+                keys[key] = existing._merge(value)
         return self
 
-    def _iter_strings(self, indent=1, show_counts=True):
+    def _iter_strings(self, indent, count_str):
         if not (self):
-            yield _count(self, show_counts) + "{}"
+            yield count_str(self) + "{}"
         else:
-            yield _count(self, show_counts) + "{"
+            yield count_str(self) + "{"
             for key in sorted(self.keys):
-                lines = self[key]._iter_strings(indent=indent, show_counts=show_counts)
-                yield " " * indent + f"{key} : {next(lines)}"
-                line = next(lines, None)
-                for next_line in lines:
+                lines = list(
+                    self.keys[key]._iter_strings(indent=indent, count_str=count_str)
+                )
+                # the first line follows the key, the closing line is aligned with it
+                yield " " * indent + f"{key} : {lines[0]}"
+                for line in lines[1:-1]:
                     yield " " * indent * 2 + line
-                    line = next_line
-                if line is not None:
-                    yield " " * indent + line
+                if len(lines) > 1:
+                    yield " " * indent + lines[-1]
             yield "}"
 
-    def _iter_statistics(self, depth=1):
+    def _collect_statistics(self, rows, prefix="", depth=1):
 
         if depth <= 0:
             return
 
-        for key, value in DictStructure.statistic_sorting(self.keys):
-            yield key, value.short_type_str, value.count, value.count / self.count * 100
-            yield from value._iter_sub_statistics(depth=depth)
+        # keys and substructures counts can change in place,
+        # so the cached ordering is only reused while they are all unchanged
+        keys = self.keys
+        order = self._statistics_order
+        if (
+            order is None
+            or len(order) != len(keys)
+            or any(
+                keys.get(key) is not value or value.count != count
+                for key, value, count in order
+            )
+        ):
+            order = self._statistics_order = [
+                (key, value, value.count)
+                for key, value in DictStructure.statistic_sorting(self.keys)
+            ]
+        total = self.count
+        sub_prefix = prefix + "    "
+        for key, value, _ in order:
+            rows.append(
+                (
+                    prefix + key,
+                    value.short_type_str,
+                    value.count,
+                    value.count / total * 100,
+                )
+            )
+            value._collect_statistics(rows, prefix=sub_prefix, depth=depth - 1)
 
     @staticmethod
     def statistic_sorting(_dict):
@@ -260,11 +386,16 @@ class ListStructure(CountableSchema):
     Stores the merged structure of the array's elements
     """
 
+    __slots__ = ("element_schema",)
+
     def __init__(self, _list):
         super().__init__()
         self.element_schema = Empty()
-        for element in _list:
-            self.element_schema += make_schema(element)
+        if not isinstance(_list, (list, tuple)):
+            # the elements are walked more than once
+            _list = list(_list)
+        if _list:
+            _fill(self, _list)
 
     def __hash__(self):
         return hash((list, hash(self.element_schema)))
@@ -278,35 +409,45 @@ class ListStructure(CountableSchema):
     def __bool__(self):
         return self.element_schema != Empty()
 
+    def _copy(self):
+        cls = type(self)
+        res = cls.__new__(cls)
+        res._count = self._count
+        res.element_schema = self.element_schema
+        return res
+
+    def _copy_children(self):
+        self.element_schema = self.element_schema._copy()
+        return (self.element_schema,)
+
     def _merge_same_type(self, other):
-        self.add_counts(other)
-        self.element_schema += other.element_schema
+        self._count += other._count
+        self.element_schema = self.element_schema._merge(other.element_schema)
         return self
 
-    def _iter_strings(self, indent=1, show_counts=True):
+    def _iter_strings(self, indent, count_str):
         if not (self):
-            yield _count(self, show_counts) + "[]"
+            yield count_str(self) + "[]"
         else:
             yield "["
             for line in self.element_schema._iter_strings(
-                indent=indent, show_counts=show_counts
+                indent=indent, count_str=count_str
             ):
                 yield " " * indent + line
             yield "]"
 
-    def _iter_statistics(self, depth=1):
+    def _collect_statistics(self, rows, prefix="", depth=1):
 
         if depth <= 0:
             return
 
-        yield f"[{self.element_schema.count}]", self.element_schema.short_type_str
-        yield from self.element_schema._iter_sub_statistics(depth=depth)
-
-    def _iter_sub_statistics(self, depth=1):
-        if depth <= 0:
-            return
-        for key, *info in self._iter_statistics(depth=depth - 1):
-            yield (f"    {key}", *info)
+        element_schema = self.element_schema
+        rows.append(
+            (f"{prefix}[{element_schema.count}]", element_schema.short_type_str)
+        )
+        element_schema._collect_statistics(
+            rows, prefix=prefix + "    ", depth=depth - 1
+        )
 
     @property
     def short_type_str(self):
@@ -319,12 +460,15 @@ class Variant(Schema):
     Represents an alternative between otherwise non-mergable structures
 
     Keeps a collection of scalar types, one merged object structure, and one merged list structure
+    The object and list structures are None when the variant has none
     """
 
+    __slots__ = ("values", "dicts", "lists")
+
     def __init__(self, objects):
-        self.values = dict()
-        self.dicts = Empty()
-        self.lists = Empty()
+        self.values = {}
+        self.dicts = None
+        self.lists = None
 
         for obj in map(make_schema, objects):
             self._merge(obj)
@@ -349,75 +493,147 @@ class Variant(Schema):
             return False
 
     def __bool__(self):
-        return bool(self.values) or (self.dicts != Empty()) or (self.lists != Empty())
+        return bool(self.values) or (self.dicts is not None) or (self.lists is not None)
 
     def __iter__(self):
         yield from self.values.values()
-        if self.lists != Empty():
+        if self.lists is not None:
             yield self.lists
-        if self.dicts != Empty():
+        if self.dicts is not None:
             yield self.dicts
 
     @property
     def count(self):
         return sum(x.count for x in self)
 
-    def _merge_same_type(self, other):
+    def _copy(self):
+        cls = type(self)
+        res = cls.__new__(cls)
+        res.values = dict(self.values)
+        res.dicts = self.dicts
+        res.lists = self.lists
+        return res
+
+    def _copy_children(self):
+        self.values = {_type: value._copy() for _type, value in self.values.items()}
+        if self.dicts is not None:
+            self.dicts = self.dicts._copy()
+        if self.lists is not None:
+            self.lists = self.lists._copy()
+        return list(self)
 
-        # merge common types
-        for _type in self.values.keys() & other.values.keys():
-            self.values[_type] += other.values[_type]
-        # add new types
-        for _type in other.values.keys() - self.values.keys():
-            self.values[_type] = other.values[_type]
+    def _merge_same_type(self, other):
 
-        self.dicts += other.dicts
-        self.lists += other.lists
+        # same as _merge_value, inlined since this runs for every type of the other variant
+        values = self.values
+        get = values.get
+        for _type, value in other.values.items():
+            existing = get(_type)
+            if existing is None:
+                values[_type] = value._clone()
+            else:
+                existing._count += value._count
+
+        if other.dicts is not None:
+            self._merge_dict(other.dicts)
+        if other.lists is not None:
+            self._merge_list(other.lists)
 
         return self
 
     def _merge(self, other):
-        if isinstance(other, Variant):
-            return self._merge_same_type(other)
+        merge = _VARIANT_MERGES.get(type(other))
+        if merge is None:
+            # subclasses of the schema classes
+            for _type, merge in _VARIANT_MERGES.items():
+                if isinstance(other, _type):
+                    break
+            else:
+                return self
+        merge(self, other)
+        return self
+
+    def _merge_empty(self, other):
+        pass
+
+    def _merge_scalar(self, other):
+        self._merge_value(other.type, other)
+
+    def _merge_list(self, other):
+        if self.lists is None:
+            self.lists = other._clone()
         else:
-            if isinstance(other, Value):
-                if other.type in self.values:
-                    self.values[other.type] += other
-                else:
-                    self.values[other.type] = other
-            elif isinstance(other, ListStructure):
-                self.lists += other
-            elif isinstance(other, DictStructure):
-                self.dicts += other
-            return self
+            self.lists = self.lists._merge(other)
+
+    def _merge_dict(self, other):
+        if self.dicts is None:
+            self.dicts = other._clone()
+        else:
+            self.dicts = self.dicts._merge(other)
 
-    def _iter_strings(self, indent=1, show_counts=True):
+    def _merge_value(self, _type, value):
+        # values are stored by type, so a known type only needs its count updated
+        existing = self.values.get(_type)
+        if existing is None:
+            self.values[_type] = value._clone()
+        else:
+            existing.add_counts(value)
+
+    def _iter_strings(self, indent, count_str):
         if not (self):
-            yield _count(self, show_counts) + "Variant()"
-        elif self.values and (self.dicts == self.lists == Empty()):
-            yield _count(
-                self, show_counts
-            ) + f'Variant({", ".join("".join(x._iter_strings(indent=indent, show_counts=show_counts)) for x in self.values.values())})'
+            yield count_str(self) + "Variant()"
+        elif self.values and self.dicts is None and self.lists is None:
+            yield count_str(
+                self
+            ) + f'Variant({", ".join("".join(x._iter_strings(indent=indent, count_str=count_str)) for x in self.values.values())})'
         else:
-            yield _count(self, show_counts) + "Variant("
+            yield count_str(self) + "Variant("
             for value in self:
-                for line in value._iter_strings(indent=indent, show_counts=show_counts):
+                for line in value._iter_strings(indent=indent, count_str=count_str):
                     yield " " * indent + line
             yield ")"
 
-    def _iter_statistics(self, depth=1):
+    def _collect_statistics(self, rows, prefix="", depth=1):
 
         if depth <= 0:
             return
+        total = self.count
+        sub_prefix = prefix + "    "
         for schema in self:
-            yield f"<{schema.short_type_str}>", schema.short_type_str, schema.count, schema.count / self.count * 100
-            yield from schema._iter_sub_statistics(depth=depth)
+            rows.append(
+                (
+                    f"{prefix}<{schema.short_type_str}>",
+                    schema.short_type_str,
+                    schema.count,
+                    schema.count / total * 100,
+                )
+            )
+            schema._collect_statistics(rows, prefix=sub_prefix, depth=depth - 1)
 
     @property
     def short_type_str(self):
         return f'Variant({", ".join(x.short_type_str for x in self)})'
 
 
+_VARIANT_MERGES = {
+    Empty: Variant._merge_empty,
+    Value: Variant._merge_scalar,
+    ListStructure: Variant._merge_list,
+    DictStructure: Variant._merge_dict,
+    Variant: Variant._merge_same_type,
+}
+
+_SCHEMA_CLASSES = {
+    dict: DictStructure,
+    list: ListStructure,
+    int: Value,
+    float: Value,
+    str: Value,
+    bool: Value,
+    type(None): Value,
+}
+
+
 def make_schema(obj):
     """
     Create a schema from a json-like object
@@ -426,6 +642,11 @@ def make_schema(obj):
     Send the object back if it's already a schema
     """
 
+    # fast path for the exact json types, subclasses are handled below
+    schema_class = _SCHEMA_CLASSES.get(type(obj))
+    if schema_class is not None:
+        return schema_class(obj)
+
     if not isinstance(obj, Schema):
         if isinstance(obj, dict):
             return DictStructure(obj)
@@ -439,8 +660,140 @@ def make_schema(obj):
         return obj
 
 
-def _count(s, show_counts=True):
-    res = ""
-    if show_counts:
-        res += f"{s.count}×"
-    return res
+def _fill(root, obj):
+    """
+    Merge the contents of a dict or a list into its DictStructure or ListStructure
+
+    Nested dicts and lists are walked depth-first with an explicit stack instead of recursion,
+    so deeply nested documents do not hit the recursion limit,
+    and each one is merged straight into the matching existing substructure when there is one
+    """
+
+    stack = [(root, _open(root, obj, 1), 1)]
+    while stack:
+        schema, items, weight = stack[-1]
+        try:
+            item = next(items)
+        except StopIteration:
+            stack.pop()
+            continue
+
+        if isinstance(schema, DictStructure):
+            key, value = item
+            if type(key) is not str and not isinstance(key, str):
+                raise TypeError(f"Invalid type for key {key} : {type(key).__name__}")
+            result, target, sub_items = _absorb(schema.keys.get(key), value, weight)
+            schema.keys[key] = result
+        else:
+            value, weight = item
+            result, target, sub_items = _absorb(schema.element_schema, value, weight)
+            schema.element_schema = result
+
+        if sub_items is not None:
+            stack.append((target, sub_items, weight))
+
+
+def _open(schema, obj, weight):
+    """
+    Prepare the merge of a dict or a list occuring weight times into its structure,
+    returns an iterator over what is left to merge
+
+    Elements of a list are grouped by type first : json scalars are only counted,
+    and never turned into individual schemas
+    The other elements are yielded along with their own weight
+    """
+
+    if isinstance(schema, DictStructure):
+        schema._statistics_order = None
+        return iter(obj.items())
+
+    others = False
+    for _type, count in Counter(map(type, obj)).items():
+        if _SCHEMA_CLASSES.get(_type) is Value:
+            value = Value._from_type(_type, count * weight)
+            if isinstance(schema.element_schema, Empty):
+                schema.element_schema = value
+            else:
+                schema.element_schema = schema.element_schema._merge(value)
+        else:
+            others = True
+
+    if not others:
+        return iter(())
+    return _iter_runs(
+        (element for element in obj if _SCHEMA_CLASSES.get(type(element)) is not Value),
+        weight,
+    )
+
+
+def _iter_runs(elements, weight):
+    """
+    Group consecutive references to the same object, as found in lists built like [obj] * n,
+    yields each object once along with its total weight
+    """
+
+    for _, run in groupby(elements, key=id):
+        run = list(run)
+        yield run[0], len(run) * weight
+
+
+def _absorb(existing, obj, weight):
+    """
+    Merge a json-like object occuring weight times into an existing schema,
+    or into nothing if existing is None or Empty
+
+    Returns the resulting schema, and for a dict or a list, the structure within it
+    along with the iterator over the contents that are still to be merged into that structure
+    (None and None otherwise)
+    """
+
+    schema_class = _SCHEMA_CLASSES.get(type(obj))
+    if existing is None:
+        existing = Empty()
+    empty = isinstance(existing, Empty)
+
+    if schema_class is Value:
+        if type(existing) is Value and existing.type is type(obj):
+            existing._count += weight
+            return existing, None, None
+        value = Value._from_type(type(obj), weight)
+        if empty:
+            return value, None, None
+        return existing._merge(value), None, None
+    elif schema_class is not None and (empty or type(existing) is schema_class):
+        if empty:
+            existing = schema_class(type(obj)())
+            existing._count = weight
+        else:
+            existing._count += weight
+        return existing, existing, _open(existing, obj, weight)
+    elif schema_class is not None and type(existing) in (
+        Value,
+        DictStructure,
+        ListStructure,
+        Variant,
+    ):
+        # a dict or a list that does not match the existing schema :
+        # an empty structure is merged first,
+        # its contents are then merged into the one found in the resulting variant
+        structure = schema_class(type(obj)())
+        structure._count = weight
+        result = existing._merge(structure)
+        structure = result.dicts if schema_class is DictStructure else result.lists
+        return result, structure, _open(structure, obj, weight)
+    else:
+        # schemas and subclasses of the json types are built on their own,
+        # then merged through the generic path
+        schema = make_schema(obj)
+        if weight != 1:
+            # merged once, with its counts scaled
+            schema = schema._clone(weight)
+        return existing._merge(schema), None, None
+
+
+def _count(s):
+    return f"{s.count}×"
+
+
+def _no_count(s):
+    return ""
@@ -1,4 +1,5 @@
 import random
+import sys
 
 from json_schema_discovery import (
     make_schema,
@@ -69,3 +70,324 @@ def test_merge_same_values():
 
     assert isinstance(schema, Value)
     assert schema.count == 2
+
+
+def test_mixed_list():
+
+    schema = make_schema([1, "a", 2, {"key": 1}, {"key": "b"}, [], 3.0, 4])
+
+    assert isinstance(schema.element_schema, Variant)
+    assert schema.element_schema.values[int].count == 3
+    assert schema.element_schema.values[str].count == 1
+    assert schema.element_schema.values[float].count == 1
+    assert schema.element_schema.dicts.count == 2
+    assert schema.element_schema.dicts["key"].count == 2
+    assert schema.element_schema.lists.count == 1
+    assert schema.element_schema.count == 8
+
+
+def test_dumps():
+
+    schema = make_schema({"b": [1, "a"], "a": {"c": None}, "d": {}})
+
+    assert schema.dumps() == "\n".join(
+        [
+            "1×{",
+            " a : 1×{",
+            "   c : 1×NoneType",
+            " }",
+            " b : [",
+            "   2×Variant(1×int, 1×str)",
+            " ]",
+            " d : 1×{}",
+            "}",
+        ]
+    )
+    assert schema.dumps(indent=2, show_counts=False) == "\n".join(
+        [
+            "{",
+            "  a : {",
+            "      c : NoneType",
+            "  }",
+            "  b : [",
+            "      Variant(int, str)",
+            "  ]",
+            "  d : {}",
+            "}",
+        ]
+    )
+
+
+def test_from_columns():
+
+    schema = DictStructure.from_columns(
+        {"id": list(range(10)), "name": ["a"] * 9 + [None], "tags": [["x"], []]}
+    )
+
+    expected = Empty()
+    for i in range(10):
+        record = {"id": i, "name": "a" if i < 9 else None}
+        if i < 2:
+            record["tags"] = ["x"] if i == 0 else []
+        expected += record
+
+    assert schema == expected
+    assert schema.count == 10
+    assert schema["id"].count == 10
+    assert schema["name"].values[str].count == 9
+    assert schema["tags"].count == 2
+
+
+def test_deep_nesting():
+
+    depth = sys.getrecursionlimit() * 2
+    obj = 1
+    for i in range(depth):
+        obj = [obj] if i % 2 else {"key": obj}
+
+    def check(schema):
+        for i in reversed(range(depth)):
+            if i % 2:
+                assert isinstance(schema, ListStructure)
+                schema = schema.element_schema
+            else:
+                assert isinstance(schema, DictStructure)
+                schema = schema["key"]
+        assert schema == make_schema(1)
+
+    check(make_schema(obj))
+
+    schema = Empty()
+    schema += obj
+    check(schema)
+
+    # copied when merged into an empty schema
+    schema = Empty()
+    schema += make_schema(obj)
+    check(schema)
+
+    # the nested structures do not match the existing ones
+    schema = make_schema({"key": 1})
+    schema += {"key": obj}
+    schema = schema["key"]
+    assert isinstance(schema, Variant)
+    assert schema.count == 2
+    check(schema.lists)
+
+    mixed = 1
+    for _ in range(depth):
+        mixed = [1, mixed]
+    schema = make_schema(mixed)
+    for _ in range(depth - 1):
+        assert isinstance(schema, ListStructure)
+        schema = schema.element_schema
+        assert isinstance(schema, Variant)
+        assert schema.values[int].count == 1
+        schema = schema.lists
+    assert schema.element_schema == make_schema(1)
+    assert schema.element_schema.count == 2
+
+
+def test_merge_variants():
+
+    schema_a = Empty()
+    schema_a += 1
+    schema_a += [1]
+    schema_b = Empty()
+    schema_b += "a"
+    schema_b += ["a", "b"]
+    schema_b += {"key": 1}
+
+    schema_a += schema_b
+
+    assert isinstance(schema_a, Variant)
+    assert schema_a.count == 5
+    assert schema_a.values.keys() == set((int, str))
+    assert schema_a.lists.count == 2
+    assert schema_a.lists.element_schema.values[int].count == 1
+    assert schema_a.lists.element_schema.values[str].count == 2
+    assert schema_a.dicts.count == 1
+
+    # the right hand side is left untouched
+    assert schema_b.count == 3
+    assert schema_b.lists.element_schema == make_schema("a")
+    assert schema_b.lists.element_schema.count == 2
+
+
+def test_merge_does_not_alter_other():
+
+    schema_a = make_schema({"key": 1})
+    schema_b = make_schema({"sub": {"key": 1}})
+
+    schema_a += schema_b
+    schema_a += {"sub": {"key": "a", "other": None}}
+
+    assert isinstance(schema_a["sub"]["key"], Variant)
+    assert schema_b["sub"]["key"] == make_schema(1)
+    assert schema_b["sub"]["key"].count == 1
+    assert schema_b["sub"].keys.keys() == {"key"}
+
+
+def test_statistics(capsys):
+
+    schema = make_schema([{"key": 1, "sub": {"other": "a"}}, {"key": "a"}])
+
+    schema.statistics(depth=3)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ["path", "type", "occurences", "%"]
+    assert len(lines) == 2 + 6
+
+    rows = []
+    schema._collect_statistics(rows, depth=3)
+    assert rows == [
+        ("[2]", "dict"),
+        ("    key", "Variant(int, str)", 2, 100.0),
+        ("        <int>", "int", 1, 50.0),
+        ("        <str>", "str", 1, 50.0),
+        ("    sub", "dict", 1, 50.0),
+        ("        other", "str", 1, 100.0),
+    ]
+
+    rows = []
+    schema._collect_statistics(rows, depth=2)
+    assert rows == [
+        ("[2]", "dict"),
+        ("    key", "Variant(int, str)", 2, 100.0),
+        ("    sub", "dict", 1, 50.0),
+    ]
+
+
+def test_repeated_elements():
+
+    element = {"key": [1, "a"], "other": {"key": None}}
+    schema = make_schema([[element] * 3, [element, {"key": []}, element]])
+
+    assert schema.count == 1
+    assert schema.element_schema.count == 2
+    assert schema.element_schema.element_schema.count == 6
+    dicts = schema.element_schema.element_schema
+    assert dicts["key"].count == 6
+    assert dicts["key"].element_schema.values[int].count == 5
+    assert dicts["key"].element_schema.values[str].count == 5
+    assert dicts["other"].count == 5
+    assert dicts["other"]["key"].count == 5
+
+    # merged through the generic path, after the list elements already seen
+    class Subclass(dict):
+        pass
+
+    element = make_schema({"key": [1, 2]})
+    schema = make_schema([1] + [Subclass(key=[1])] * 3 + [element] * 2)
+
+    assert schema.element_schema.values[int].count == 1
+    dicts = schema.element_schema.dicts
+    assert dicts.count == 5
+    assert dicts["key"].count == 5
+    assert dicts["key"].element_schema.count == 7
+    # schemas found in the list are left untouched
+    assert element.count == 1
+    assert element["key"].element_schema.count == 2
+
+
+def test_variant_count_follows_members():
+
+    variant = make_schema([1, {"key": 1}]).element_schema
+    assert variant.count == 2
+
+    member = variant.dicts
+    member += {"key": 2}
+
+    assert variant.count == 3
+
+
+def test_hash_follows_substructures():
+
+    schema = make_schema({"sub": {"key": 1}})
+    hash(schema)
+
+    sub = schema["sub"]
+    sub += {"key": "a"}
+
+    expected = make_schema({"sub": {"key": 1}})
+    expected += {"sub": {"key": "a"}}
+    assert schema == expected
+    assert hash(schema) == hash(expected)
+
+    variant = make_schema([1, "a"]).element_schema
+    assert repr(variant) == "Variant(int, str)"
+    variant.values.pop(int)
+    variant.lists = make_schema([1])
+    assert repr(variant) == "Variant(str, list)"
+
+
+def test_cached_orderings_are_reset():
+
+    schema = make_schema({"b": 1, "c": 1})
+    assert [line.split()[0] for line in schema.dumps().splitlines()[1:-1]] == ["b", "c"]
+    rows = []
+    schema._collect_statistics(rows)
+    assert [row[0] for row in rows] == ["b", "c"]
+
+    schema += {"a": 1, "c": 1}
+
+    assert [line.split()[0] for line in schema.dumps().splitlines()[1:-1]] == ["a", "b", "c"]
+    rows = []
+    schema._collect_statistics(rows)
+    assert [row[0] for row in rows] == ["c", "a", "b"]
+
+    # counts changed in place through a substructure
+    sub = schema["b"]
+    sub += 2
+    sub += 3
+    rows = []
+    schema._collect_statistics(rows)
+    assert [row[0] for row in rows] == ["b", "c", "a"]
+
+    # keys edited directly
+    schema.keys["d"] = make_schema([1])
+    assert "d" in schema.dumps()
+    rows = []
+    schema._collect_statistics(rows)
+    assert [row[0] for row in rows] == ["b", "c", "a", "d"]
+
+    del schema.keys["d"]
+    assert "d" not in schema.dumps()
+    rows = []
+    schema._collect_statistics(rows)
+    assert [row[0] for row in rows] == ["b", "c", "a"]
+
+    schema.keys["a"] = make_schema("a")
+    rows = []
+    schema._collect_statistics(rows)
+    assert rows[2][:2] == ("a", "str")
+
+
+def test_copies_keep_subclasses():
+
+    class MyDict(DictStructure):
+        pass
+
+    class MyValue(Value):
+        pass
+
+    schema = Empty()
+    schema += MyDict({"key": 1, "sub": {"other": [1, "a"]}})
+
+    assert type(schema) is MyDict
+    assert schema == make_schema({"key": 1, "sub": {"other": [1, "a"]}})
+
+    schema = make_schema({"key": 1})
+    schema += {"new": MyValue(1)}
+
+    assert type(schema["new"]) is MyValue
+
+
+def test_list_from_iterable():
+
+    elements = [1, {"key": 1}, [2]]
+
+    schema = ListStructure(element for element in elements)
+
+    assert schema == make_schema(elements)
+    assert schema.element_schema.count == 3